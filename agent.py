@@ -1,14 +1,57 @@
+import atexit
 import json
 import httpx
 import asyncio
+import threading
+from collections import defaultdict
+import numpy as np
+import orjson
 from phi.agent import Agent, AgentKnowledge
+from phi.memory.agent import AgentRun
+from phi.model.message import Message
+from phi.run.response import RunResponse
 from phi.model.google import Gemini
 from typing import Dict, Optional, List
 import time
 
+try:
+    import uvloop
+except ImportError:  # uvloop is optional and unavailable on Windows
+    uvloop = None
+
 # API endpoint configuration
 API_BASE_URL = "http://localhost:8000"  # Change this to your actual API host if different
 
+# Shared HTTP clients so every tool call reuses pooled keep-alive connections to the API
+_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=100)
+_ASYNC_CLIENT = httpx.AsyncClient(base_url=API_BASE_URL, timeout=30.0, limits=_HTTP_LIMITS)
+_SYNC_CLIENT = httpx.Client(base_url=API_BASE_URL, timeout=15.0, limits=_HTTP_LIMITS)
+
+
+async def aclose_clients():
+    """Close the shared async HTTP client. Await this from the event loop that used it."""
+    await _ASYNC_CLIENT.aclose()
+
+
+# Long-lived event loop for the sync wrappers, so _ASYNC_CLIENT keeps its connections between calls
+_LOOP = uvloop.new_event_loop() if uvloop is not None else asyncio.new_event_loop()
+_LOOP_LOCK = threading.Lock()
+
+
+def _run_sync(coro):
+    """Run a coroutine to completion on the shared event loop."""
+    with _LOOP_LOCK:
+        return _LOOP.run_until_complete(coro)
+
+
+def _shutdown():
+    _SYNC_CLIENT.close()
+    _LOOP.run_until_complete(aclose_clients())
+    _LOOP.close()
+
+
+atexit.register(_shutdown)
+
 
 # Create wrapper functions that use the API endpoints instead of direct function calls
 async def api_crawl_website(url: str, pattern: str = '*', max_depth: int = 2,
@@ -27,37 +70,36 @@ async def api_crawl_website(url: str, pattern: str = '*', max_depth: int = 2,
     Returns:
         str: A message about the crawl process and its completion status.
     """
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        # Start the crawl
-        crawl_request = {
-            "url": url,
-            "pattern": pattern,
-            "max_depth": max_depth,
-            "collection_name": collection_name
-        }
+    # Start the crawl
+    crawl_request = {
+        "url": url,
+        "pattern": pattern,
+        "max_depth": max_depth,
+        "collection_name": collection_name
+    }
 
-        try:
-            # Initiate the crawl
-            start_response = await client.post(f"{API_BASE_URL}/crawl", json=crawl_request)
-            start_response.raise_for_status()
+    try:
+        # Initiate the crawl
+        start_response = await _ASYNC_CLIENT.post("/crawl", json=crawl_request)
+        start_response.raise_for_status()
 
-            start_data = start_response.json()
-            task_id = start_data.get("task_id")
+        start_data = orjson.loads(start_response.content)
+        task_id = start_data.get("task_id")
 
-            if not task_id:
-                return f"Failed to start crawling: No task ID returned from the API"
+        if not task_id:
+            return f"Failed to start crawling: No task ID returned from the API"
 
-            # Return immediate response that crawling has started
-            return (
-                f"Crawling started for {url} with task ID: {task_id}.\n"
-                f"The content will be saved to collection '{collection_name}'.\n"
-                f"You can check the status using the task ID."
-            )
+        # Return immediate response that crawling has started
+        return (
+            f"Crawling started for {url} with task ID: {task_id}.\n"
+            f"The content will be saved to collection '{collection_name}'.\n"
+            f"You can check the status using the task ID."
+        )
 
-        except httpx.HTTPError as e:
-            return f"Failed to start crawling: {str(e)}"
-        except Exception as e:
-            return f"An error occurred: {str(e)}"
+    except httpx.HTTPError as e:
+        return f"Failed to start crawling: {str(e)}"
+    except Exception as e:
+        return f"An error occurred: {str(e)}"
 
 
 def sync_crawl_website(url: str, pattern: str = '*', max_depth: int = 2, collection_name: str = "web_content") -> str:
@@ -75,12 +117,8 @@ def sync_crawl_website(url: str, pattern: str = '*', max_depth: int = 2, collect
     Returns:
         str: A message about the crawl process and its completion status.
     """
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    result = loop.run_until_complete(
+    return _run_sync(
         api_crawl_website(url=url, pattern=pattern, max_depth=max_depth, collection_name=collection_name))
-    loop.close()
-    return result
 
 
 def check_crawl_status(task_id: str) -> str:
@@ -94,59 +132,70 @@ def check_crawl_status(task_id: str) -> str:
         str: Information about the crawl task status.
     """
     try:
-        with httpx.Client(timeout=10.0) as client:
-            response = client.get(f"{API_BASE_URL}/crawl/{task_id}")
-            response.raise_for_status()
-
-            status_data = response.json()
-            status = status_data.get("status", "unknown")
-
-            if status == "completed":
-                pages = status_data.get("pages_crawled", "unknown number of")
-                return (
-                    f"Crawl task {task_id} completed successfully.\n"
-                    f"Crawled {pages} pages from {status_data.get('url')}.\n"
-                    f"Content saved to collection '{status_data.get('collection_name')}'."
-                )
-            elif status == "failed":
-                return f"Crawl task {task_id} failed: {status_data.get('error', 'Unknown error')}"
-            else:
-                return f"Crawl task {task_id} is {status}. Started at {status_data.get('start_time')}."
+        response = _SYNC_CLIENT.get(f"/crawl/{task_id}", timeout=10.0)
+        response.raise_for_status()
+
+        status_data = orjson.loads(response.content)
+        status = status_data.get("status", "unknown")
+
+        if status == "completed":
+            pages = status_data.get("pages_crawled", "unknown number of")
+            return (
+                f"Crawl task {task_id} completed successfully.\n"
+                f"Crawled {pages} pages from {status_data.get('url')}.\n"
+                f"Content saved to collection '{status_data.get('collection_name')}'."
+            )
+        elif status == "failed":
+            return f"Crawl task {task_id} failed: {status_data.get('error', 'Unknown error')}"
+        else:
+            return f"Crawl task {task_id} is {status}. Started at {status_data.get('start_time')}."
 
     except Exception as e:
         return f"Failed to check crawl status: {str(e)}"
 
 
-def list_crawl_tasks() -> str:
+def list_crawl_tasks(status: Optional[str] = None, limit: int = 50, offset: int = 0) -> str:
     """
-    Lists all crawl tasks and their statuses.
+    Lists crawl tasks and their statuses, oldest first.
+
+    Args:
+        status (str, optional): Only list tasks with this status: pending, in_progress, completed or failed.
+            Lists all tasks by default.
+        limit (int, optional): The maximum number of tasks to list. Default is 50.
+        offset (int, optional): The number of tasks to skip, for paging through long lists. Default is 0.
 
     Returns:
-        str: Information about all crawl tasks.
+        str: Information about the crawl tasks.
     """
     try:
-        with httpx.Client(timeout=10.0) as client:
-            response = client.get(f"{API_BASE_URL}/crawls")
-            response.raise_for_status()
-
-            tasks_data = response.json()
-            if not tasks_data.get("tasks"):
-                return "No crawl tasks found."
-
-            tasks_info = []
-            for task in tasks_data.get("tasks", []):
-                task_info = (
-                    f"Task ID: {task.get('task_id')}\n"
-                    f"URL: {task.get('url')}\n"
-                    f"Status: {task.get('status')}\n"
-                    f"Collection: {task.get('collection_name')}\n"
-                )
-                if task.get("pages_crawled") is not None:
-                    task_info += f"Pages crawled: {task.get('pages_crawled')}\n"
+        params = {"limit": limit, "offset": offset}
+        if status is not None:
+            params["status"] = status
+        response = _SYNC_CLIENT.get("/crawls", params=params, timeout=10.0)
+        response.raise_for_status()
+
+        tasks_data = orjson.loads(response.content)
+        if not tasks_data.get("tasks"):
+            return "No crawl tasks found."
+
+        tasks_info = []
+        for task in tasks_data.get("tasks", []):
+            task_info = (
+                f"Task ID: {task.get('task_id')}\n"
+                f"URL: {task.get('url')}\n"
+                f"Status: {task.get('status')}\n"
+                f"Collection: {task.get('collection_name')}\n"
+            )
+            if task.get("pages_crawled") is not None:
+                task_info += f"Pages crawled: {task.get('pages_crawled')}\n"
 
-                tasks_info.append(task_info)
+            tasks_info.append(task_info)
 
-            return "Current crawl tasks:\n\n" + "\n".join(tasks_info)
+        total = tasks_data.get("total", len(tasks_info))
+        return (
+                f"Current crawl tasks (showing {len(tasks_info)} of {total}):\n\n"
+                + "\n".join(tasks_info)
+        )
 
     except Exception as e:
         return f"Failed to list crawl tasks: {str(e)}"
@@ -160,21 +209,20 @@ def list_collections() -> str:
         str: Information about available collections.
     """
     try:
-        with httpx.Client(timeout=10.0) as client:
-            response = client.get(f"{API_BASE_URL}/collections")
-            response.raise_for_status()
+        response = _SYNC_CLIENT.get("/collections", timeout=10.0)
+        response.raise_for_status()
 
-            collections_data = response.json()
-            collections = collections_data.get("collections", [])
+        collections_data = orjson.loads(response.content)
+        collections = collections_data.get("collections", [])
 
-            if not collections:
-                return "No collections found. You need to crawl a website first."
+        if not collections:
+            return "No collections found. You need to crawl a website first."
 
-            collection_info = []
-            for collection in collections:
-                collection_info.append(f"Collection name: {collection.get('name')}")
+        collection_info = []
+        for collection in collections:
+            collection_info.append(f"Collection name: {collection.get('name')}")
 
-            return "Available collections:\n" + "\n".join(collection_info)
+        return "Available collections:\n" + "\n".join(collection_info)
 
     except Exception as e:
         return f"Failed to list collections: {str(e)}"
@@ -193,50 +241,49 @@ def query_chromadb(collection_name: str, query: str, n_results: int = 5) -> str:
         str: Search results with documents and their metadata.
     """
     try:
-        with httpx.Client(timeout=15.0) as client:
-            query_request = {
-                "collection_name": collection_name,
-                "query": query,
-                "n_results": n_results
-            }
-
-            response = client.post(f"{API_BASE_URL}/query", json=query_request)
-            response.raise_for_status()
-
-            results_data = response.json()
-
-            if "error" in results_data:
-                return f"Query error: {results_data.get('message')}"
-
-            results = results_data.get("results", [])
-
-            if not results:
-                return f"No results found for '{query}' in collection '{collection_name}'."
-
-            formatted_results = []
-
-            for result in results:
-                # Extract relevant information
-                rank = result.get("rank", "N/A")
-                score = result.get("relevance_score", 0)
-                metadata = result.get("metadata", {})
-                url = metadata.get("url", "Unknown URL")
-                title = metadata.get("title", "Untitled")
-                content = result.get("content_preview", "No content preview available")
-
-                # Format the result
-                formatted_result = (
-                    f"Result #{rank} (Score: {score:.2f})\n"
-                    f"Title: {title}\n"
-                    f"URL: {url}\n\n"
-                    f"Content: {content}\n"
-                )
-                formatted_results.append(formatted_result)
+        query_request = {
+            "collection_name": collection_name,
+            "query": query,
+            "n_results": n_results
+        }
 
-            return (
-                    f"Query results for '{query}' in collection '{collection_name}':\n\n"
-                    + "\n---\n".join(formatted_results)
+        response = _SYNC_CLIENT.post("/query", json=query_request)
+        response.raise_for_status()
+
+        results_data = orjson.loads(response.content)
+
+        if "error" in results_data:
+            return f"Query error: {results_data.get('message')}"
+
+        results = results_data.get("results", [])
+
+        if not results:
+            return f"No results found for '{query}' in collection '{collection_name}'."
+
+        formatted_results = []
+
+        for result in results:
+            # Extract relevant information
+            rank = result.get("rank", "N/A")
+            score = result.get("relevance_score", 0)
+            metadata = result.get("metadata", {})
+            url = metadata.get("url", "Unknown URL")
+            title = metadata.get("title", "Untitled")
+            content = result.get("content_preview", "No content preview available")
+
+            # Format the result
+            formatted_result = (
+                f"Result #{rank} (Score: {score:.2f})\n"
+                f"Title: {title}\n"
+                f"URL: {url}\n\n"
+                f"Content: {content}\n"
             )
+            formatted_results.append(formatted_result)
+
+        return (
+                f"Query results for '{query}' in collection '{collection_name}':\n\n"
+                + "\n---\n".join(formatted_results)
+        )
 
     except Exception as e:
         return f"Failed to query collection: {str(e)}"
@@ -294,5 +341,147 @@ agent = Agent(
 )
 
 
+# Tools with side effects or results that change over time; answers that called them are never cached
+UNCACHEABLE_TOOLS = {
+    sync_crawl_website.__name__,
+    check_crawl_status.__name__,
+    list_crawl_tasks.__name__,
+    list_collections.__name__,
+}
+
+
+class SemanticAgentCache:
+    """
+    In-memory cache of agent responses, namespaced by workspace.
+
+    A message is answered from the cache when it matches an earlier message exactly
+    (ignoring case and surrounding whitespace) or when its embedding has a cosine
+    similarity of at least `similarity_threshold` with one. Entries expire after `ttl` seconds.
+    """
+
+    def __init__(self, ttl: float = 3600, similarity_threshold: float = 0.92, maxsize: int = 256):
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.maxsize = maxsize
+        self._entries = defaultdict(list)  # namespace -> [(timestamp, normalized message, unit embedding, response)]
+        self._embedding_function = None
+        self._lock = threading.Lock()
+
+    def embed(self, message: str):
+        """Embed a message with ChromaDB's default local model, or return None if it is unavailable"""
+        try:
+            if self._embedding_function is None:
+                from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+                self._embedding_function = DefaultEmbeddingFunction()
+            embedding = np.asarray(self._embedding_function([message])[0], dtype=np.float32)
+            return embedding / np.linalg.norm(embedding)
+        except Exception:
+            return None
+
+    def has_entries(self, namespace: str = "default") -> bool:
+        """Return whether the namespace holds any unexpired responses"""
+        now = time.monotonic()
+        with self._lock:
+            return any(now - e[0] < self.ttl for e in self._entries.get(namespace, []))
+
+    def get(self, message: str, embedding=None, namespace: str = "default"):
+        """Return a cached response for the message (with its embedding from embed(), if any), or None on a miss"""
+        normalized = message.strip().lower()
+        now = time.monotonic()
+        with self._lock:
+            entries = [e for e in self._entries[namespace] if now - e[0] < self.ttl]
+            self._entries[namespace] = entries
+            for entry in entries:
+                if entry[1] == normalized:
+                    return entry[3]
+            candidates = [e for e in entries if e[2] is not None]
+        if embedding is None or not candidates:
+            return None
+
+        similarities = np.stack([e[2] for e in candidates]) @ embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] >= self.similarity_threshold:
+            return candidates[best][3]
+        return None
+
+    def put(self, message: str, response: str, embedding=None, namespace: str = "default"):
+        """Store the response given for a message"""
+        entry = (time.monotonic(), message.strip().lower(), embedding, response)
+        with self._lock:
+            entries = self._entries[namespace]
+            entries.append(entry)
+            del entries[:-self.maxsize]
+
+
+response_cache = SemanticAgentCache()
+
+
+def _remember_cached_turn(message: str, response: str):
+    """Record a turn answered from the cache in the agent's memory, so follow-up questions still see it"""
+    messages = [Message(role="user", content=message), Message(role="assistant", content=response)]
+    agent.memory.add_run(AgentRun(message=messages[0], response=RunResponse(content=response, messages=messages)))
+
+
+def stream_agent(message: str, use_cache: bool = True, namespace: str = "default",
+                 history: Optional[List[Dict]] = None):
+    """
+    Streams the agent's response to a message, reusing a cached response for repeated or near-duplicate questions.
+
+    Args:
+        message (str): The user's message.
+        use_cache (bool, optional): Set to False to always call the model. Responses for which the agent
+            called a tool in UNCACHEABLE_TOOLS are never cached regardless. Default is True.
+        namespace (str, optional): The workspace the cached responses are shared within. Default is "default".
+        history (list, optional): The earlier {"role", "content"} messages of this chat. Only the opening
+            message of a chat is answered from or stored in the cache, since follow-ups depend on context.
+
+    Yields:
+        str: Pieces of the response text as they are generated. A cached response is yielded whole.
+    """
+    # Follow-ups like "tell me more" only make sense in their chat, so only opening messages are cached
+    use_cache = use_cache and not history
+    embedding = None
+    if use_cache:
+        # Embedding runs a local model, so skip it when there is nothing to compare against
+        if response_cache.has_entries(namespace):
+            embedding = response_cache.embed(message)
+        cached = response_cache.get(message, embedding, namespace)
+        if cached is not None:
+            _remember_cached_turn(message, cached)
+            yield cached
+            return
+
+    chunks = []
+    for chunk in agent.run(message, stream=True):
+        if chunk.content:
+            chunks.append(chunk.content)
+            yield chunk.content
+
+    # Only cache answers that did not start a crawl or report live task and collection state
+    tools_called = {tool.get("tool_name") for tool in (agent.run_response.tools or [])}
+    if use_cache and not tools_called & UNCACHEABLE_TOOLS:
+        if embedding is None:
+            embedding = response_cache.embed(message)
+        response_cache.put(message, "".join(chunks), embedding, namespace)
+
+
+def ask_agent(message: str, use_cache: bool = True, namespace: str = "default",
+              history: Optional[List[Dict]] = None) -> str:
+    """
+    Answers a message with the agent, reusing a cached response for repeated or near-duplicate questions.
+
+    Args:
+        message (str): The user's message.
+        use_cache (bool, optional): Set to False to always call the model. Responses for which the agent
+            called a tool in UNCACHEABLE_TOOLS are never cached regardless. Default is True.
+        namespace (str, optional): The workspace the cached responses are shared within. Default is "default".
+        history (list, optional): The earlier {"role", "content"} messages of this chat.
+
+    Returns:
+        str: The agent's response.
+    """
+    return "".join(stream_agent(message, use_cache, namespace, history))
+
+
 def run_agent(message: str):
     return agent.run(message, stream=True)
\ No newline at end of file
@@ -10,15 +10,181 @@ from crawl4ai.content_filter_strategy import PruningContentFilter
 import chromadb
 import datetime
 import hashlib
-import json
+import functools
+import logging
 import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict, defaultdict
+import numpy as np
 
-# Initialize ChromaDB client
+logger = logging.getLogger(__name__)
 
+# Path of the persistent ChromaDB store shared by the crawler and the API
+CHROMA_PATH = './chroma'
 
 
-async def save_result(result, index, chroma_client, collection_name="web_content"):
-    """Process and save an individual result to ChromaDB"""
+@functools.lru_cache(maxsize=None)
+def get_chroma_client(path: str = CHROMA_PATH):
+    """Return the process-wide ChromaDB client for the given path, opening it on first use"""
+    return chromadb.PersistentClient(path=path)
+
+
+class QueryCache:
+    """
+    Two-tier cache of processed query results, namespaced by collection.
+
+    The exact tier is keyed on (collection_name, query, n_results). The semantic tier
+    returns a stored result when a new query's embedding has a cosine similarity of at
+    least `similarity_threshold` with a previously answered query. Entries expire after
+    `ttl` seconds and a collection's entries are dropped whenever new documents are added to it.
+
+    Each collection has a generation counter that invalidate() bumps. Callers read it with
+    generation() before querying ChromaDB and pass it to put(), so a result computed before
+    an invalidation is never stored after it.
+    """
+
+    def __init__(self, maxsize: int = 512, ttl: float = 3600, similarity_threshold: float = 0.95):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self._exact = OrderedDict()  # (collection, query, n_results) -> (timestamp, results)
+        self._semantic = defaultdict(list)  # collection -> [(timestamp, n_results, unit embedding, results)]
+        self._generations = defaultdict(int)  # collection -> number of invalidations so far
+        self._lock = threading.Lock()
+
+    def _is_fresh(self, timestamp):
+        return time.monotonic() - timestamp < self.ttl
+
+    def generation(self, collection_name):
+        """Return the collection's current generation, to be passed to put()"""
+        with self._lock:
+            return self._generations[collection_name]
+
+    def get(self, collection_name, query, n_results):
+        """Return the cached results for an identical query, or None"""
+        key = (collection_name, query, n_results)
+        with self._lock:
+            entry = self._exact.get(key)
+            if entry is None:
+                return None
+            if not self._is_fresh(entry[0]):
+                del self._exact[key]
+                return None
+            self._exact.move_to_end(key)
+            return entry[1]
+
+    def get_similar(self, collection_name, n_results, embedding):
+        """Return the cached results for the most similar earlier query above the threshold, or None"""
+        embedding = embedding / np.linalg.norm(embedding)
+        with self._lock:
+            entries = [e for e in self._semantic.get(collection_name, []) if self._is_fresh(e[0])]
+            self._semantic[collection_name] = entries
+            candidates = [e for e in entries if e[1] == n_results]
+            if not candidates:
+                return None
+            similarities = np.stack([e[2] for e in candidates]) @ embedding
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.similarity_threshold:
+                return candidates[best][3]
+            return None
+
+    def put(self, collection_name, query, n_results, results, generation, embedding=None):
+        """
+        Store results in the exact tier and, when an embedding is given, the semantic tier.
+
+        Results computed under an older generation than the collection's current one are dropped.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if generation != self._generations[collection_name]:
+                return
+
+            self._exact[(collection_name, query, n_results)] = (now, results)
+            self._exact.move_to_end((collection_name, query, n_results))
+            while len(self._exact) > self.maxsize:
+                self._exact.popitem(last=False)
+
+            if embedding is not None:
+                entries = self._semantic[collection_name]
+                entries.append((now, n_results, embedding / np.linalg.norm(embedding), results))
+                del entries[:-self.maxsize]
+
+    def invalidate(self, collection_name):
+        """Drop every cached result for a collection and start a new generation"""
+        with self._lock:
+            self._generations[collection_name] += 1
+            for key in [k for k in self._exact if k[0] == collection_name]:
+                del self._exact[key]
+            self._semantic.pop(collection_name, None)
+
+
+# Shared cache in front of query_chromadb
+query_cache = QueryCache()
+
+
+def _embed_query(collection, query):
+    """Embed a query with the collection's own embedding function, or return None if unavailable"""
+    embedding_function = getattr(collection, "_embedding_function", None)
+    if embedding_function is None:
+        return None
+    try:
+        return np.asarray(embedding_function([query])[0], dtype=np.float32)
+    except Exception:
+        return None
+
+
+# Stateless strategies shared by every crawl
+SCRAPING_STRATEGY = LXMLWebScrapingStrategy()
+MARKDOWN_GENERATOR = DefaultMarkdownGenerator(
+    content_filter=PruningContentFilter(threshold=0.6),
+    options={"ignore_links": True}
+)
+
+
+def _make_config(pattern: str, max_depth: int) -> CrawlerRunConfig:
+    """
+    Build the run configuration for one crawl.
+
+    The deep crawl strategy and its filter chain track per-run state (visited pages, filter
+    stats), so they are created fresh for each crawl; the scraping and markdown strategies are shared.
+    """
+    # Configure URL filters to focus on documentation
+    url_filter = URLPatternFilter(patterns=[f"*{pattern}*"])
+
+    # Configure the crawler
+    return CrawlerRunConfig(
+        deep_crawl_strategy=BFSDeepCrawlStrategy(
+            max_depth=max_depth,
+            include_external=False,
+            filter_chain=FilterChain([url_filter])
+        ),
+        scraping_strategy=SCRAPING_STRATEGY,
+        verbose=True,
+        markdown_generator=MARKDOWN_GENERATOR,
+        stream=True  # Enable streaming mode
+    )
+
+
+# Dedicated threads for ChromaDB writes, so they neither block the event loop nor pile onto the SQLite writer
+CHROMA_WRITE_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chroma-writer")
+
+
+# Number of pages buffered before they are written to ChromaDB in a single add() call
+BATCH_SIZE = 32
+
+
+def new_batch():
+    """Create an empty buffer of parallel lists matching collection.add() keyword arguments"""
+    return {"documents": [], "metadatas": [], "ids": []}
+
+
+async def save_result(result, index, batch, timestamp):
+    """Process an individual result and append it to the pending ChromaDB batch"""
+    # Probe for the optional parsed page object once
+    page_content = getattr(result, 'content', None)
+
     # Extract content
     try:
         if result.markdown is not None:
@@ -28,43 +194,73 @@ async def save_result(result, index, chroma_client, collection_name="web_content
     except Exception as e:
         content = f"Error extracting markdown: {str(e)}\nFalling back to plain text."
         # Try to get any available content as fallback
-        if hasattr(result, 'content') and result.content is not None:
+        if page_content is not None:
             try:
-                content += "\n\n" + result.content.get_text()
+                content += "\n\n" + page_content.get_text()
             except:
                 pass
 
-    # Save to ChromaDB
     try:
-        # Get or create collection
-        collection = chroma_client.get_or_create_collection(name=collection_name)
-
         # Prepare metadata
         metadata = {
             "url": result.url,
             "depth": result.metadata.get('depth', 0),
-            "timestamp": datetime.datetime.now().isoformat(),
+            "timestamp": timestamp,
         }
 
         # Add title to metadata if available
-        if hasattr(result, 'content') and hasattr(result.content, 'get_title'):
-            metadata["title"] = result.content.get_title()
+        if page_content is not None and hasattr(page_content, 'get_title'):
+            metadata["title"] = page_content.get_title()
 
         # Generate a document ID based on URL
-        doc_id = f"doc_{index:03d}_{hashlib.md5(result.url.encode()).hexdigest()[:12]}"
+        doc_id = f"doc_{index:03d}_{hashlib.blake2b(result.url.encode(), digest_size=6).hexdigest()}"
 
-        # Add document to collection
-        collection.add(
-            documents=[content],
-            metadatas=[metadata],
-            ids=[doc_id]
-        )
-        print(f"Added content from {result.url} to ChromaDB collection '{collection_name}'")
+        batch["documents"].append(content)
+        batch["metadatas"].append(metadata)
+        batch["ids"].append(doc_id)
+        logger.debug("Buffered %s for ChromaDB", result.url)
     except Exception as e:
-        print(f"Error saving to ChromaDB: {str(e)}")
+        logger.error("Error preparing %s for ChromaDB: %s", result.url, e)
 
 
-async def crawl_website(url: str, pattern: str = '*', max_depth: int = 2, collection_name: str = "web_content") -> str:
+async def flush_batch(collection, batch) -> int:
+    """
+    Write all pending documents to the collection and clear the batch, returning how many were saved.
+
+    The whole batch is written in one call. If ChromaDB rejects it, the documents are retried one
+    by one so a single invalid page only loses that page.
+    """
+    if not batch["ids"]:
+        return 0
+
+    loop = asyncio.get_running_loop()
+    saved = 0
+    try:
+        # The write is synchronous SQLite work, so run it off the event loop
+        await loop.run_in_executor(CHROMA_WRITE_EXECUTOR, functools.partial(collection.add, **batch))
+        saved = len(batch["ids"])
+    except Exception as e:
+        logger.error("Error saving batch to ChromaDB, retrying pages one by one: %s", e)
+        for document, metadata, doc_id in zip(batch["documents"], batch["metadatas"], batch["ids"]):
+            try:
+                await loop.run_in_executor(CHROMA_WRITE_EXECUTOR, functools.partial(
+                    collection.add, documents=[document], metadatas=[metadata], ids=[doc_id]
+                ))
+                saved += 1
+            except Exception as e:
+                logger.error("Error saving %s to ChromaDB: %s", metadata.get("url", doc_id), e)
+    finally:
+        for values in batch.values():
+            values.clear()
+
+    if saved:
+        query_cache.invalidate(collection.name)
+        logger.info("Flushed %d pages to ChromaDB collection '%s'", saved, collection.name)
+    return saved
+
+
+async def crawl_website(url: str, pattern: str = '*', max_depth: int = 2, collection_name: str = "web_content",
+                        chroma_client=None) -> dict:
     # Initialize ChromaDB client
     """
        Crawls a website and stores the content in a ChromaDB collection for later retrieval.
@@ -80,71 +276,88 @@ async def crawl_website(url: str, pattern: str = '*', max_depth: int = 2, collec
            max_depth (int, optional): The maximum depth to crawl from the starting URL. Default is 2.
            collection_name (str, optional): The name of the ChromaDB collection to store the results.
                Default is "web_content".
+           chroma_client (optional): The ChromaDB client to write to. Defaults to the shared client
+               returned by get_chroma_client().
 
        Returns:
-           str: A confirmation message indicating the number of pages crawled and where they were saved.
+           dict: The number of pages saved to ChromaDB ("pages"), the collection they were saved to
+               ("collection") and a confirmation message ("message").
 
        Example:
            # >>> result = await crawl_website("https://docs.example.com", pattern="guide", max_depth=3)
            # >>> print(result)
-           "Successfully crawled 42 pages and saved to ChromaDB collection 'web_content'"
+           {"pages": 42, "collection": "web_content",
+            "message": "Successfully crawled 42 pages and saved 42 to ChromaDB collection 'web_content'"}
 
        Note:
            This function requires the ChromaDB client to be properly configured and accessible.
            The crawled content is stored only in ChromaDB and not saved as files to the filesystem.
     """
-    chroma_client = chromadb.PersistentClient(path='./chroma')
+    if chroma_client is None:
+        chroma_client = get_chroma_client()
 
-    # Configure URL filters to focus on documentation
-    url_filter = URLPatternFilter(patterns=[f"*{pattern}*"])
-
-    # Configure the crawler
-    config = CrawlerRunConfig(
-        deep_crawl_strategy=BFSDeepCrawlStrategy(
-            max_depth=max_depth,
-            include_external=False,
-            filter_chain=FilterChain([url_filter])
-        ),
-        scraping_strategy=LXMLWebScrapingStrategy(),
-        verbose=True,
-        markdown_generator=DefaultMarkdownGenerator(
-            content_filter=PruningContentFilter(threshold=0.6),
-            options={"ignore_links": True}
-        ),
-        stream=True  # Enable streaming mode
-    )
+    config = _make_config(pattern, max_depth)
 
     # Run the crawler in streaming mode
     async with AsyncWebCrawler() as crawler:
         # Get the async iterator
         results_iterator = await crawler.arun(f"{url}", config=config)
 
-        # Process each result as it becomes available
-        counter = 0
-        async for result in results_iterator:
-            counter += 1
-            await save_result(result, counter, chroma_client, collection_name)
-
-        print(f"Crawled and processed {counter} pages in total")
-        print(f"Documentation saved to ChromaDB collection '{collection_name}'")
+        # Get or create the target collection once for the whole crawl
+        collection = await asyncio.get_running_loop().run_in_executor(
+            CHROMA_WRITE_EXECUTOR, functools.partial(chroma_client.get_or_create_collection, name=collection_name)
+        )
 
-        return f"Successfully crawled {counter} pages and saved to ChromaDB collection '{collection_name}'"
+        # Buffer each result as it becomes available and write full batches in the background,
+        # so the next pages are pulled from the crawler while the previous batch is persisted
+        counter = 0
+        saved = 0
+        batch = new_batch()
+        pending_flush = None
+        # Every page from this crawl is stamped with the time the crawl started
+        crawl_timestamp = datetime.datetime.now().isoformat()
+        try:
+            async for result in results_iterator:
+                counter += 1
+                await save_result(result, counter, batch, crawl_timestamp)
+                if len(batch["ids"]) >= BATCH_SIZE:
+                    if pending_flush is not None:
+                        saved += await pending_flush
+                    pending_flush = asyncio.create_task(flush_batch(collection, batch))
+                    batch = new_batch()
+        finally:
+            # Persist the pages already processed even if the crawl fails partway through
+            if pending_flush is not None:
+                saved += await pending_flush
+            saved += await flush_batch(collection, batch)
+
+        logger.info("Crawled %d pages in total, saved %d to ChromaDB collection '%s'",
+                    counter, saved, collection_name)
+
+        return {
+            "pages": saved,
+            "collection": collection_name,
+            "message": f"Successfully crawled {counter} pages and saved {saved} to ChromaDB collection '{collection_name}'"
+        }
 
 
-def list_collections() -> dict:
+def list_collections(chroma_client=None) -> dict:
     """
     List all available collections in ChromaDB.
 
+    Args:
+        chroma_client (optional): The ChromaDB client to read from. Defaults to the shared client.
+
     Returns:
-        str: A JSON string containing the list of available collections.
+        dict: The list of available collections, or an error and message if listing failed.
     """
     try:
-        # Initialize ChromaDB client
-        chroma_client = chromadb.PersistentClient('./chroma')
+        if chroma_client is None:
+            chroma_client = get_chroma_client()
 
         # Get all collections
         collections = chroma_client.list_collections()
-        print(collections)
+        logger.debug("Collections: %s", collections)
 
         # Extract collection names and sizes
         collection_info = []
@@ -154,20 +367,50 @@ def list_collections() -> dict:
             collection_info.append({
                 "name": collection,
                         })
-        print(collection_info)
-        return json.dumps({
+        return {
             "collections": collection_info
-        }, indent=2)
+        }
 
     except Exception as e:
-        print(e)
-        return json.dumps({
+        logger.error("Failed to list collections: %s", e)
+        return {
             "error": str(e),
             "message": "Failed to list collections."
-        }, indent=2)
+        }
+
+
+# Fields fetched from ChromaDB for a query; embeddings are never needed by callers
+QUERY_INCLUDE = ["documents", "metadatas", "distances"]
+
 
+def _process_query_results(results):
+    """Turn a raw collection.query() response into ranked result entries"""
+    # Process results
+    response_data = []
+    if results and "documents" in results and results["documents"]:
+        documents = results["documents"][0]  # First query results
+        metadatas = results["metadatas"][0]  # Corresponding metadata
+        distances = results["distances"][0]  # Relevance scores (lower is better)
 
-def query_chromadb(collection_name: str, query: str, n_results: int = 5) -> str:
+        for i, (doc, meta, dist) in enumerate(zip(documents, metadatas, distances)):
+            # Truncate document content if too long
+            doc_preview = doc[:300] + "..." if len(doc) > 300 else doc
+
+            # Create result entry
+            result_entry = {
+                "rank": i + 1,
+                "relevance_score": 1 - dist,  # Convert distance to similarity score
+                "metadata": meta,
+                "content_preview": doc_preview,
+                "full_content": doc
+            }
+            response_data.append(result_entry)
+
+    return response_data
+
+
+def query_chromadb(collection_name: str, query: str, n_results: int = 5, chroma_client=None,
+                   include_full_content: bool = False) -> dict:
     """
     Query a ChromaDB collection for relevant documents based on semantic similarity.
 
@@ -178,62 +421,76 @@ def query_chromadb(collection_name: str, query: str, n_results: int = 5) -> str:
         collection_name (str): The name of the ChromaDB collection to query.
         query (str): The search query to find relevant content.
         n_results (int, optional): The number of results to return. Default is 5.
+        chroma_client (optional): The ChromaDB client to query. Defaults to the shared client.
+        include_full_content (bool, optional): Whether each result carries the whole document as
+            "full_content" in addition to the 300 character preview. Default is False.
 
     Returns:
-        str: A JSON string containing the search results with documents and their metadata.
+        dict: The search results with documents and their metadata, or an error and message if the query failed.
     """
     try:
-        # Initialize ChromaDB client
-        chroma_client = chromadb.PersistentClient('./chroma')
-
-        # Get the collection
-        collection = chroma_client.get_collection(name=collection_name)
-
-        # Query the collection
-        results = collection.query(
-            query_texts=[query],
-            n_results=n_results
-        )
-
-        # Process results
-        response_data = []
-        if results and "documents" in results and results["documents"]:
-            documents = results["documents"][0]  # First query results
-            metadatas = results["metadatas"][0]  # Corresponding metadata
-            distances = results["distances"][0]  # Relevance scores (lower is better)
-
-            for i, (doc, meta, dist) in enumerate(zip(documents, metadatas, distances)):
-                # Truncate document content if too long
-                doc_preview = doc[:300] + "..." if len(doc) > 300 else doc
-
-                # Create result entry
-                result_entry = {
-                    "rank": i + 1,
-                    "relevance_score": 1 - dist,  # Convert distance to similarity score
-                    "metadata": meta,
-                    "content_preview": doc_preview,
-                    "full_content": doc
-                }
-                response_data.append(result_entry)
+        if chroma_client is None:
+            chroma_client = get_chroma_client()
+
+        # Serve repeated queries without touching ChromaDB
+        generation = query_cache.generation(collection_name)
+        response_data = query_cache.get(collection_name, query, n_results)
+
+        if response_data is None:
+            # Get the collection
+            collection = chroma_client.get_collection(name=collection_name)
+
+            # Embed once so the same vector serves the semantic cache lookup and the query
+            query_embedding = _embed_query(collection, query)
+            if query_embedding is not None:
+                response_data = query_cache.get_similar(collection_name, n_results, query_embedding)
+
+            if response_data is None:
+                # Query the collection
+                if query_embedding is not None:
+                    results = collection.query(
+                        query_embeddings=[query_embedding.tolist()],
+                        n_results=n_results,
+                        include=QUERY_INCLUDE
+                    )
+                else:
+                    results = collection.query(
+                        query_texts=[query],
+                        n_results=n_results,
+                        include=QUERY_INCLUDE
+                    )
+
+                response_data = _process_query_results(results)
+                query_cache.put(collection_name, query, n_results, response_data, generation, query_embedding)
+            else:
+                # Remember the near-duplicate wording in the exact tier only
+                query_cache.put(collection_name, query, n_results, response_data, generation)
+
+        # Cached entries keep the full document; drop it unless the caller asked for it
+        if not include_full_content:
+            response_data = [
+                {key: value for key, value in entry.items() if key != "full_content"}
+                for entry in response_data
+            ]
 
         # Return formatted results
         if response_data:
-            return json.dumps({
+            return {
                 "collection": collection_name,
                 "query": query,
                 "num_results": len(response_data),
                 "results": response_data
-            }, indent=2)
+            }
         else:
-            return json.dumps({
+            return {
                 "collection": collection_name,
                 "query": query,
                 "num_results": 0,
                 "message": "No results found for this query in the collection."
-            }, indent=2)
+            }
 
     except Exception as e:
-        return json.dumps({
+        return {
             "error": str(e),
             "message": f"Failed to query collection '{collection_name}'. Make sure the collection exists and contains documents."
-        }, indent=2)
+        }
@@ -1,23 +1,49 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, HttpUrl
-import json
-from typing import Dict, List, Optional
+from typing import Optional
+import logging
+import os
 import uuid
 import asyncio
 from datetime import datetime
 
 # Import functions from the existing code file
 # Assuming the code you provided is in a file called "crawler_module.py"
-from crawler import crawl_website, list_collections, query_chromadb
+from crawler import crawl_website, get_chroma_client, list_collections, query_chromadb
+from task_store import CrawlTaskStore
+
+logger = logging.getLogger(__name__)
+
+# Send crawler progress to stderr at INFO; set CRAWLER_LOG_LEVEL=DEBUG to log every page
+crawler_logger = logging.getLogger("crawler")
+crawler_logger.setLevel(os.environ.get("CRAWLER_LOG_LEVEL", "INFO").upper())
+if not crawler_logger.handlers:
+    crawler_handler = logging.StreamHandler()
+    crawler_handler.setFormatter(logging.Formatter("%(levelname)s:     %(name)s - %(message)s"))
+    crawler_logger.addHandler(crawler_handler)
 
 app = FastAPI(
     title="Web Crawler and ChromaDB API",
     description="API for crawling websites and querying the stored content using ChromaDB",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
-# In-memory storage for tracking crawl tasks
-crawl_tasks: Dict[str, Dict] = {}
+
+@app.on_event("startup")
+async def open_chroma_client():
+    # Open the persistent ChromaDB store once and share it across requests
+    app.state.chroma = get_chroma_client()
+
+
+# Number of crawls (each with its own headless browser) allowed to run at once in this process
+CRAWL_WORKERS = int(os.environ.get("CRAWL_WORKERS", "2"))
+
+# Crawl task state lives in SQLite so finished tasks stay listable after an API restart;
+# tasks a restart interrupts are marked failed at startup.
+# Its calls block on the SQLite lock, so handlers run them through asyncio.to_thread.
+crawl_tasks = CrawlTaskStore()
 
 
 # Define request and response models
@@ -38,6 +64,7 @@ class QueryRequest(BaseModel):
     collection_name: str
     query: str
     n_results: int = 5
+    include_full_content: bool = False
 
 
 class CrawlStatus(BaseModel):
@@ -55,37 +82,71 @@ class CrawlStatus(BaseModel):
 async def crawl_task(task_id: str, url: str, pattern: str, max_depth: int, collection_name: str):
     try:
         # Update task status to "in_progress"
-        crawl_tasks[task_id]["status"] = "in_progress"
+        await asyncio.to_thread(crawl_tasks.update, task_id, status="in_progress")
         print('crawl started')
         # Run the crawl function
-        result = await crawl_website(url, pattern, max_depth, collection_name)
-        print(f'completed extraction with {result}')
-        # Extract page count from result message
-        import re
-        pages_match = re.search(r"Successfully crawled (\d+) pages", result)
-        pages_crawled = int(pages_match.group(1)) if pages_match else None
+        result = await crawl_website(url, pattern, max_depth, collection_name, chroma_client=app.state.chroma)
+        print(f'completed extraction with {result["message"]}')
 
         # Update task status to "completed"
-        crawl_tasks[task_id].update({
-            "status": "completed",
-            "finish_time": datetime.now().isoformat(),
-            "pages_crawled": pages_crawled
-        })
+        await asyncio.to_thread(
+            crawl_tasks.update,
+            task_id,
+            status="completed",
+            finish_time=datetime.now().isoformat(),
+            pages_crawled=result["pages"]
+        )
     except Exception as e:
         # Update task status to "failed"
-        crawl_tasks[task_id].update({
-            "status": "failed",
-            "finish_time": datetime.now().isoformat(),
-            "error": str(e)
-        })
+        await asyncio.to_thread(
+            crawl_tasks.update,
+            task_id,
+            status="failed",
+            finish_time=datetime.now().isoformat(),
+            error=str(e)
+        )
+
+
+async def crawl_worker(queue: asyncio.Queue):
+    # Run queued crawls one at a time; crawl_task records its own failures
+    while True:
+        task = await queue.get()
+        try:
+            await crawl_task(**task)
+        except Exception:
+            # Keep the worker alive even if recording the task's status failed
+            logger.exception("Crawl worker failed on task %s", task["task_id"])
+        finally:
+            queue.task_done()
+
+
+@app.on_event("startup")
+async def start_crawl_workers():
+    # The queue is in memory, so crawls left queued or running by a previous run can never finish
+    await asyncio.to_thread(crawl_tasks.fail_unfinished, "Interrupted by an API restart", datetime.now().isoformat())
+
+    # Bound the number of concurrent crawls so they cannot starve the API's event loop
+    app.state.crawl_queue = asyncio.Queue()
+    app.state.crawl_workers = [
+        asyncio.create_task(crawl_worker(app.state.crawl_queue))
+        for _ in range(CRAWL_WORKERS)
+    ]
+
+
+@app.on_event("shutdown")
+async def stop_crawl_workers():
+    for worker in app.state.crawl_workers:
+        worker.cancel()
+    await asyncio.gather(*app.state.crawl_workers, return_exceptions=True)
 
 
 @app.post("/crawl", response_model=CrawlResponse, tags=["Crawling"])
-async def start_crawl(crawl_request: CrawlRequest, background_tasks: BackgroundTasks):
+async def start_crawl(crawl_request: CrawlRequest):
     """
     Start crawling a website and store the content in ChromaDB.
 
-    The crawling process runs in the background and may take some time depending on the website size and max_depth.
+    The crawl is queued and runs in the background once a crawl worker is free; it may take some time
+    depending on the website size and max_depth. The task stays "pending" until a worker picks it up.
     Returns a task_id that can be used to check the status of the crawl.
     """
     try:
@@ -93,26 +154,25 @@ async def start_crawl(crawl_request: CrawlRequest, background_tasks: BackgroundT
         task_id = str(uuid.uuid4())
         print(crawl_request.json())
         # Store task information
-        crawl_tasks[task_id] = {
+        await asyncio.to_thread(crawl_tasks.create, task_id, {
             "url": str(crawl_request.url),
             "collection_name": crawl_request.collection_name,
             "status": "pending",
             "start_time": datetime.now().isoformat()
-        }
+        })
 
-        # Add crawling task to background tasks
-        background_tasks.add_task(
-            crawl_task,
-            task_id,
-            str(crawl_request.url),
-            crawl_request.pattern,
-            crawl_request.max_depth,
-            crawl_request.collection_name
-        )
+        # Queue the crawl for the worker pool
+        await app.state.crawl_queue.put({
+            "task_id": task_id,
+            "url": str(crawl_request.url),
+            "pattern": crawl_request.pattern,
+            "max_depth": crawl_request.max_depth,
+            "collection_name": crawl_request.collection_name
+        })
 
         return {
             "task_id": task_id,
-            "message": f"Crawling started for {crawl_request.url} with max depth {crawl_request.max_depth}. Results will be saved to collection '{crawl_request.collection_name}'.",
+            "message": f"Crawling queued for {crawl_request.url} with max depth {crawl_request.max_depth}. Results will be saved to collection '{crawl_request.collection_name}'.",
             "status": "pending"
         }
     except Exception as e:
@@ -124,10 +184,10 @@ async def get_crawl_status(task_id: str):
     """
     Get the status of a crawl task by its ID.
     """
-    if task_id not in crawl_tasks:
+    task_info = await asyncio.to_thread(crawl_tasks.get, task_id)
+    if task_info is None:
         raise HTTPException(status_code=404, detail=f"Crawl task with ID {task_id} not found")
 
-    task_info = crawl_tasks[task_id]
     return {
         "task_id": task_id,
         **task_info
@@ -135,15 +195,23 @@ async def get_crawl_status(task_id: str):
 
 
 @app.get("/crawls", tags=["Crawling"])
-async def list_crawl_tasks():
+async def list_crawl_tasks(
+        limit: int = Query(50, ge=1, le=500),
+        offset: int = Query(0, ge=0),
+        status: Optional[str] = None
+):
     """
-    List all crawl tasks and their statuses.
+    List crawl tasks and their statuses, oldest first.
+
+    Results are paginated with limit and offset and can be filtered by status
+    (pending, in_progress, completed or failed). The total number of matching tasks is included.
     """
+    tasks, total = await asyncio.to_thread(crawl_tasks.list, limit=limit, offset=offset, status=status)
     return {
-        "tasks": [
-            {"task_id": task_id, **task_info}
-            for task_id, task_info in crawl_tasks.items()
-        ]
+        "tasks": tasks,
+        "total": total,
+        "limit": limit,
+        "offset": offset
     }
 
 
@@ -153,9 +221,7 @@ async def get_collections():
     List all available collections in ChromaDB.
     """
     try:
-        collections_json = list_collections()
-        collections_data = json.loads(collections_json)
-        return collections_data
+        return list_collections(chroma_client=app.state.chroma)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to list collections: {str(e)}")
 
@@ -166,12 +232,13 @@ async def query_collection(query_request: QueryRequest):
     Query a ChromaDB collection for relevant documents based on semantic similarity.
     """
     try:
-        results_json = query_chromadb(
+        results_data = query_chromadb(
             query_request.collection_name,
             query_request.query,
-            query_request.n_results
+            query_request.n_results,
+            chroma_client=app.state.chroma,
+            include_full_content=query_request.include_full_content
         )
-        results_data = json.loads(results_json)
 
         # Check if there was an error in the query
         if "error" in results_data:
@@ -195,7 +262,7 @@ async def root():
             {"path": "/", "method": "GET", "description": "This information"},
             {"path": "/crawl", "method": "POST", "description": "Start crawling a website"},
             {"path": "/crawl/{task_id}", "method": "GET", "description": "Get status of a specific crawl task"},
-            {"path": "/crawls", "method": "GET", "description": "List all crawl tasks"},
+            {"path": "/crawls", "method": "GET", "description": "List crawl tasks (paginated, filterable by status)"},
             {"path": "/collections", "method": "GET", "description": "List all available collections"},
             {"path": "/query", "method": "POST", "description": "Query a collection"}
         ]
@@ -205,4 +272,6 @@ async def root():
 if __name__ == "__main__":
     import uvicorn
 
+    # Single process only: ChromaDB's persistent client and the query cache are per-process
+    # uvicorn's default loop="auto" already runs on uvloop when it is installed
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
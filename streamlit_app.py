@@ -1,5 +1,5 @@
 import streamlit as st
-from agent import agent
+from agent import stream_agent
 import uuid
 
 # Initialize the assistant
@@ -48,6 +48,8 @@ if user_input:
 
     # Get assistant response
     with st.chat_message("assistant"):
-        response = agent.run(user_input).content
-        st.markdown(response)
+        # Render tokens as they arrive; write_stream returns the full text for the chat history
+        response = st.write_stream(
+            stream_agent(user_input, history=st.session_state.chats[chat_id][:-1])
+        )
         st.session_state.chats[chat_id].append({"role": "assistant", "content": response})
@@ -0,0 +1,97 @@
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+
+# Path of the SQLite file holding crawl task state
+TASKS_DB_PATH = './crawl_tasks.db'
+
+
+class CrawlTaskStore:
+    """
+    Persistent storage for crawl task state in a single API process.
+
+    Finished tasks stay listable after a restart; the API marks tasks a restart
+    interrupted as failed at startup.
+
+    Each task is stored as a JSON document keyed by its task ID, with its status kept
+    in a separate column so it can be filtered without decoding every row.
+    """
+
+    def __init__(self, path: str = TASKS_DB_PATH):
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30.0)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            # WAL lets status reads proceed while a crawl task writes its status
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS crawl_tasks ("
+                "task_id TEXT PRIMARY KEY, status TEXT NOT NULL, data TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_crawl_tasks_status ON crawl_tasks (status)")
+
+    def create(self, task_id: str, task_info: Dict):
+        """Store a new task"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO crawl_tasks (task_id, status, data) VALUES (?, ?, ?)",
+                (task_id, task_info["status"], orjson.dumps(task_info).decode())
+            )
+
+    def get(self, task_id: str) -> Optional[Dict]:
+        """Return the stored information for a task, or None if it does not exist"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM crawl_tasks WHERE task_id = ?", (task_id,)
+            ).fetchone()
+        return orjson.loads(row[0]) if row else None
+
+    def update(self, task_id: str, **fields):
+        """Merge the given fields into a stored task"""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT data FROM crawl_tasks WHERE task_id = ?", (task_id,)
+            ).fetchone()
+            if row is None:
+                raise KeyError(task_id)
+            task_info = {**orjson.loads(row[0]), **fields}
+            self._conn.execute(
+                "UPDATE crawl_tasks SET status = ?, data = ? WHERE task_id = ?",
+                (task_info["status"], orjson.dumps(task_info).decode(), task_id)
+            )
+
+    def fail_unfinished(self, error: str, finish_time: str) -> int:
+        """Mark every pending or in_progress task as failed with the given error, returning how many were marked"""
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT task_id, data FROM crawl_tasks WHERE status IN ('pending', 'in_progress')"
+            ).fetchall()
+            for task_id, data in rows:
+                task_info = {**orjson.loads(data), "status": "failed", "finish_time": finish_time, "error": error}
+                self._conn.execute(
+                    "UPDATE crawl_tasks SET status = ?, data = ? WHERE task_id = ?",
+                    (task_info["status"], orjson.dumps(task_info).decode(), task_id)
+                )
+        return len(rows)
+
+    def list(self, limit: int = 50, offset: int = 0, status: Optional[str] = None) -> Tuple[List[Dict], int]:
+        """
+        Return one page of tasks, oldest first, with their task_id included.
+
+        Args:
+            limit (int, optional): The maximum number of tasks to return. Default is 50.
+            offset (int, optional): The number of matching tasks to skip. Default is 0.
+            status (str, optional): Only return tasks with this status. Default is all tasks.
+
+        Returns:
+            tuple: The page of tasks and the total number of tasks matching the status filter.
+        """
+        where, params = ("WHERE status = ?", (status,)) if status is not None else ("", ())
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM crawl_tasks {where}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT task_id, data FROM crawl_tasks {where} ORDER BY rowid LIMIT ? OFFSET ?",
+                (*params, limit, offset)
+            ).fetchall()
+        return [{"task_id": task_id, **orjson.loads(data)} for task_id, data in rows], total